@@ -2,16 +2,28 @@
 """Generate a marking addendum DOCX from a template and client metadata.
 
 The script keeps template wording (section texts) and applies clean business formatting.
+By default the document body is rendered from a prebuilt WordprocessingML skeleton;
+``--legacy`` builds it paragraph by paragraph through python-docx instead.
 """
 
 from __future__ import annotations
 
 import argparse
+import csv
+import functools
+import hashlib
+import io
+import json
 import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from xml.sax.saxutils import escape
 
 try:
+    import docx
     from docx import Document
+    from docx.enum.style import WD_STYLE_TYPE
     from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_TAB_ALIGNMENT
     from docx.shared import Cm, Pt
 except ModuleNotFoundError:
@@ -22,132 +34,257 @@ except ModuleNotFoundError:
         "Then rerun this script from the same shell."
     )
 
-MONTHS = {
-    "01": "января",
-    "02": "февраля",
-    "03": "марта",
-    "04": "апреля",
-    "05": "мая",
-    "06": "июня",
-    "07": "июля",
-    "08": "августа",
-    "09": "сентября",
-    "10": "октября",
-    "11": "ноября",
-    "12": "декабря",
-}
+_MONTHS = (
+    "января",
+    "февраля",
+    "марта",
+    "апреля",
+    "мая",
+    "июня",
+    "июля",
+    "августа",
+    "сентября",
+    "октября",
+    "ноября",
+    "декабря",
+)
+
+
+# Every spacing/indent the layout uses, built once instead of per paragraph.
+_PT = {n: Pt(n) for n in (0, 2, 3, 4, 6, 8, 10, 12, 14)}
+_CM = {v: Cm(v) for v in (0, 1.25, 2, 8.8, 16.5)}
+
+_CLEAN_TABLE = str.maketrans({"\u2028": "\n", "\xa0": " "})
+_BULLET_SPLIT = re.compile(r"[\n\r]+")
+
+
+# Expected structure from the working template used by the team:
+# (block key, paragraph index, fallback text). Fallbacks are included to keep the script
+# usable with near-identical templates.
+TEMPLATE_SPEC = (
+    ("h1", 6, "1. Предмет соглашения"),
+    ("p12", 8, "1.2. Услуги по сопровождению обязательной маркировки рекламы включают:"),
+    (
+        "bullets",
+        9,
+        "— администрирование размещений, подлежащих обязательной маркировке;\n"
+        "— взаимодействие с рекламной платформой;\n"
+        "— контроль корректности передачи данных;\n"
+        "— формирование и сверку отчётности по маркируемой рекламе.",
+    ),
+    ("h2", 10, "2. Стоимость услуг и порядок расчётов"),
+    ("p21", 11, "2.1. Стоимость Услуг маркировки составляет 3% от объёма размещений, подлежащих обязательной маркировке (за исключением поисковых размещений), согласно официальным данным рекламной платформы."),
+    ("p22", 12, "2.2. Расчёт стоимости производится на основании отчёта платформы, формируемого в месяце, следующем за отчётным."),
+    ("p23", 13, "2.3. В случае корректировок платформы перерасчёт стоимости производится в следующем отчётном периоде."),
+    ("h3", 14, "3. Сроки оплаты"),
+    ("p31", 15, "3.1. Принципал обязуется оплатить сумму, рассчитанную по п.2.2, в течение 10 календарных дней с момента выставления Агентом счёта на оплату."),
+    ("p32", 16, "3.2. Оплата производится на расчётный счёт Агента, указанный в Договоре, с обязательной ссылкой на номер и дату настоящего Дополнительного соглашения."),
+    ("h4", 17, "4. Прочие условия"),
+    ("p41", 18, "4.1. Настоящее Дополнительное соглашение является неотъемлемой частью Договора."),
+    ("p42", 19, "4.2. Все остальные условия Договора остаются без изменений и сохраняют силу."),
+    ("p43", 20, "4.3. Настоящее Дополнительное соглашение вступает в силу с момента подписания обеими сторонами."),
+    ("h5", 21, "5. Подписи сторон"),
+)
+_FALLBACKS = {key: fallback for key, _, fallback in TEMPLATE_SPEC}
 
 
 def clean(text: str) -> str:
-    return text.replace("\u2028", "\n").replace("\xa0", " ").strip()
+    return text.translate(_CLEAN_TABLE).strip()
+
+
+# C0 control characters XML 1.0 does not allow (tab, LF and CR are fine).
+_XML_INVALID = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _xml_text(text: str) -> str:
+    """Escape text for a ``<w:t>`` element, mapping tabs and newlines like ``add_run``.
+
+    Text with characters XML cannot hold is rejected rather than written into a corrupt DOCX.
+    """
+    bad = _XML_INVALID.search(text)
+    if bad:
+        raise SystemExit(f"Text contains control character {bad.group()!r}, not allowed in DOCX: {text!r}")
+    return (
+        escape(text)
+        .replace("\t", '</w:t><w:tab/><w:t xml:space="preserve">')
+        .replace("\n", '</w:t><w:br/><w:t xml:space="preserve">')
+    )
 
 
 def format_ru_date(date_ddmmyyyy: str) -> str:
-    day, month, year = date_ddmmyyyy.split(".")
-    return f"«{day}» {MONTHS[month]} {year} года"
+    try:
+        day, month, year = date_ddmmyyyy.split(".")
+        m = int(month)
+    except ValueError:
+        m = 0
+    if not 1 <= m <= 12:
+        raise SystemExit(f"Invalid date {date_ddmmyyyy!r}: expected DD.MM.YYYY with month 01-12")
+    return f"«{day}» {_MONTHS[m - 1]} {year} года"
 
 
 def extract_template_blocks(template_path: Path) -> dict[str, str]:
-    doc = Document(str(template_path))
-    p = [clean(x.text) for x in doc.paragraphs]
-
-    # Expected structure from the working template used by the team.
-    # Fallbacks are included to keep the script usable with near-identical templates.
-    out: dict[str, str] = {
-        "h1": p[6] if len(p) > 6 else "1. Предмет соглашения",
-        "p12": p[8] if len(p) > 8 else "1.2. Услуги по сопровождению обязательной маркировки рекламы включают:",
-        "bullets": p[9]
-        if len(p) > 9
-        else "— администрирование размещений, подлежащих обязательной маркировке;\n"
-        "— взаимодействие с рекламной платформой;\n"
-        "— контроль корректности передачи данных;\n"
-        "— формирование и сверку отчётности по маркируемой рекламе.",
-        "h2": p[10] if len(p) > 10 else "2. Стоимость услуг и порядок расчётов",
-        "p21": p[11]
-        if len(p) > 11
-        else "2.1. Стоимость Услуг маркировки составляет 3% от объёма размещений, подлежащих обязательной маркировке (за исключением поисковых размещений), согласно официальным данным рекламной платформы.",
-        "p22": p[12]
-        if len(p) > 12
-        else "2.2. Расчёт стоимости производится на основании отчёта платформы, формируемого в месяце, следующем за отчётным.",
-        "p23": p[13]
-        if len(p) > 13
-        else "2.3. В случае корректировок платформы перерасчёт стоимости производится в следующем отчётном периоде.",
-        "h3": p[14] if len(p) > 14 else "3. Сроки оплаты",
-        "p31": p[15]
-        if len(p) > 15
-        else "3.1. Принципал обязуется оплатить сумму, рассчитанную по п.2.2, в течение 10 календарных дней с момента выставления Агентом счёта на оплату.",
-        "p32": p[16]
-        if len(p) > 16
-        else "3.2. Оплата производится на расчётный счёт Агента, указанный в Договоре, с обязательной ссылкой на номер и дату настоящего Дополнительного соглашения.",
-        "h4": p[17] if len(p) > 17 else "4. Прочие условия",
-        "p41": p[18]
-        if len(p) > 18
-        else "4.1. Настоящее Дополнительное соглашение является неотъемлемой частью Договора.",
-        "p42": p[19]
-        if len(p) > 19
-        else "4.2. Все остальные условия Договора остаются без изменений и сохраняют силу.",
-        "p43": p[20]
-        if len(p) > 20
-        else "4.3. Настоящее Дополнительное соглашение вступает в силу с момента подписания обеими сторонами.",
-        "h5": p[21] if len(p) > 21 else "5. Подписи сторон",
-    }
+    """Return section texts of the template, cached per resolved path and mtime.
 
-    return out
+    Within a process results are memoized; across runs the texts found in the template
+    are kept in a ``<template>.blocks.json`` sidecar next to it. The returned dict is
+    shared between callers and must not be modified.
+    """
+    return _load_blocks(*_template_id(template_path))
+
+
+def extract_template_xml(template_path: Path) -> dict[str, str]:
+    """Return each block's DOCUMENT_XML replacement, escaped (rendered paragraphs for ``bullets``).
+
+    Only the default path calls this, so ``--legacy`` never builds or checks markup.
+    Cached like extract_template_blocks(); the returned dict must not be modified.
+    """
+    return _load_blocks_xml(*_template_id(template_path))
+
+
+def _template_id(template_path: Path) -> tuple[str, int]:
+    return str(template_path.resolve()), template_path.stat().st_mtime_ns
+
+
+# Sidecars from a different block layout are ignored.
+_BLOCKS_CACHE_TAG = hashlib.sha256(repr(TEMPLATE_SPEC).encode()).hexdigest()[:16]
+
+
+def _is_found_blocks(value: object) -> bool:
+    return (
+        isinstance(value, dict)
+        and value.keys() <= _FALLBACKS.keys()
+        and all(isinstance(v, str) for v in value.values())
+    )
+
+
+@functools.lru_cache(maxsize=8)
+def _load_blocks(path_str: str, mtime_ns: int) -> dict[str, str]:
+    return {**_FALLBACKS, **_load_found_blocks(path_str, mtime_ns)}
+
+
+@functools.lru_cache(maxsize=8)
+def _load_blocks_xml(path_str: str, mtime_ns: int) -> dict[str, str]:
+    found = _load_found_blocks(path_str, mtime_ns)
+    # Fallback blocks reuse the markup prepared at import.
+    blocks_xml = dict(_FALLBACK_BLOCKS_ESCAPED)
+    for key, text in found.items():
+        blocks_xml[key] = _bullets_xml(found) if key == "bullets" else _xml_text(text)
+    return blocks_xml
+
+
+@functools.lru_cache(maxsize=8)
+def _load_found_blocks(path_str: str, mtime_ns: int) -> dict[str, str]:
+    """Return the blocks present in the template, via the ``.blocks.json`` sidecar.
+
+    Only cleaned texts are stored there; markup is always rebuilt from them.
+    """
+    template_path = Path(path_str)
+    key = [_BLOCKS_CACHE_TAG, path_str, mtime_ns]
+    cache_path = template_path.with_suffix(".blocks.json")
+    try:
+        cached = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        cached = None  # missing or unreadable sidecar: parse the template again
+    if isinstance(cached, dict) and cached.get("key") == key and _is_found_blocks(cached.get("blocks")):
+        return cached["blocks"]
+
+    found = _parse_template_blocks(template_path)
+    try:
+        cache_path.write_text(json.dumps({"key": key, "blocks": found}, ensure_ascii=False), encoding="utf-8")
+    except OSError:
+        pass  # read-only template folder: keep the in-process cache only
+    return found
+
+
+def _parse_template_blocks(template_path: Path) -> dict[str, str]:
+    """Return cleaned texts of the TEMPLATE_SPEC paragraphs the template actually has."""
+    paragraphs = Document(str(template_path)).paragraphs
+    n = len(paragraphs)
+    return {key: clean(paragraphs[i].text) for key, i, _ in TEMPLATE_SPEC if i < n}
 
 
 def set_doc_defaults(doc: Document) -> None:
     sec = doc.sections[0]
-    sec.left_margin = Cm(2)
-    sec.right_margin = Cm(2)
-    sec.top_margin = Cm(2)
-    sec.bottom_margin = Cm(2)
+    sec.left_margin = _CM[2]
+    sec.right_margin = _CM[2]
+    sec.top_margin = _CM[2]
+    sec.bottom_margin = _CM[2]
 
-    normal = doc.styles["Normal"]
+    styles = doc.styles
+    normal = styles["Normal"]
     normal.font.name = "Times New Roman"
-    normal.font.size = Pt(12)
+    normal.font.size = _PT[12]
+
+    # Shared paragraph formatting lives in these styles so paragraphs only carry overrides.
+    # The layout is defined twice: here plus build_doc() for --legacy, and in _para_xml()
+    # plus DOCUMENT_XML for the default path. Keep both in sync.
+    body = styles.add_style("Body", WD_STYLE_TYPE.PARAGRAPH)
+    body.base_style = normal
+    pf = body.paragraph_format
+    pf.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
+    pf.space_before = _PT[0]
+    pf.space_after = _PT[6]
+    pf.line_spacing = 1.15
+    pf.first_line_indent = _CM[1.25]
+
+    flush = styles.add_style("BodyFlush", WD_STYLE_TYPE.PARAGRAPH)
+    flush.base_style = body
+    flush.paragraph_format.first_line_indent = _CM[0]
+    flush.paragraph_format.space_after = _PT[3]
+
+    heading = styles.add_style("HeadingBold", WD_STYLE_TYPE.PARAGRAPH)
+    heading.base_style = flush
+    heading.font.bold = True
+    heading.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.LEFT
+    heading.paragraph_format.space_before = _PT[8]
+    heading.paragraph_format.space_after = _PT[4]
+
+    two_col = styles.add_style("TwoCol", WD_STYLE_TYPE.PARAGRAPH)
+    two_col.base_style = normal
+    pf = two_col.paragraph_format
+    pf.alignment = WD_ALIGN_PARAGRAPH.LEFT
+    pf.space_after = _PT[3]
+    pf.line_spacing = 1.15
+    pf.tab_stops.add_tab_stop(_CM[8.8], WD_TAB_ALIGNMENT.LEFT)
 
 
 def add_para(
     doc: Document,
     text: str,
     *,
-    align=WD_ALIGN_PARAGRAPH.JUSTIFY,
+    style: str | None = None,
+    align=None,
     bold: bool = False,
-    size: int = 12,
-    before: int = 0,
-    after: int = 6,
+    size: int | None = None,
+    before: int | None = None,
+    after: int | None = None,
     first_indent: bool = True,
 ) -> None:
-    p = doc.add_paragraph()
-    p.alignment = align
+    """Add a paragraph in ``style`` (``Body``/``BodyFlush`` by default); keywords override it."""
+    p = doc.add_paragraph(style=style or ("Body" if first_indent else "BodyFlush"))
+    if align is not None:
+        p.alignment = align
     pf = p.paragraph_format
-    pf.space_before = Pt(before)
-    pf.space_after = Pt(after)
-    pf.line_spacing = 1.15
-    if first_indent:
-        pf.first_line_indent = Cm(1.25)
+    if before is not None:
+        pf.space_before = _PT[before]
+    if after is not None:
+        pf.space_after = _PT[after]
 
     run = p.add_run(text)
-    run.bold = bold
-    run.font.name = "Times New Roman"
-    run.font.size = Pt(size)
+    if bold:
+        run.bold = True
+    if size is not None:
+        run.font.size = _PT[size]
 
 
-def add_two_col(doc: Document, left: str, right: str, *, bold: bool = False, after: int = 3) -> None:
-    p = doc.add_paragraph()
-    p.alignment = WD_ALIGN_PARAGRAPH.LEFT
-    pf = p.paragraph_format
-    pf.space_after = Pt(after)
-    pf.line_spacing = 1.15
-    pf.tab_stops.add_tab_stop(Cm(8.8), WD_TAB_ALIGNMENT.LEFT)
+def add_two_col(doc: Document, left: str, right: str, *, bold: bool = False, after: int | None = None) -> None:
+    p = doc.add_paragraph(style="TwoCol")
+    if after is not None:
+        p.paragraph_format.space_after = _PT[after]
 
-    l = p.add_run(left)
-    p.add_run("\t")
-    r = p.add_run(right)
-    for run in (l, r):
-        run.bold = bold
-        run.font.name = "Times New Roman"
-        run.font.size = Pt(12)
+    run = p.add_run(f"{left}\t{right}")
+    if bold:
+        run.bold = True
 
 
 def agreement_label_dative(kind: str) -> str:
@@ -158,27 +295,108 @@ def agreement_label_genitive(kind: str) -> str:
     return "агентского договора" if kind == "agent" else "договора"
 
 
-def build_doc(args: argparse.Namespace) -> Document:
-    template = extract_template_blocks(Path(args.template))
+def _para_xml(
+    text: str,
+    *,
+    align: str = "both",
+    bold: bool = False,
+    size: int = 12,
+    before: int = 0,
+    after: int = 6,
+    first_indent: bool = True,
+    tab: tuple[str, int] | None = None,
+) -> str:
+    """Return ``<w:p>`` markup equivalent to ``add_para``/``add_two_col`` output.
+
+    ``text`` is inserted verbatim (it may hold ``{{TOKEN}}`` placeholders); a tab in it
+    becomes ``<w:tab/>``. ``tab`` is a ``(alignment, position_twips)`` tab stop.
+    """
+    ppr = ""
+    if tab is not None:
+        ppr += f'<w:tabs><w:tab w:val="{tab[0]}" w:pos="{tab[1]}"/></w:tabs>'
+    ppr += f'<w:spacing w:before="{before * 20}" w:after="{after * 20}" w:line="276" w:lineRule="auto"/>'
+    if first_indent:
+        ppr += '<w:ind w:firstLine="709"/>'
+    if align:
+        ppr += f'<w:jc w:val="{align}"/>'
+    rpr = '<w:rFonts w:ascii="Times New Roman" w:hAnsi="Times New Roman"/>'
+    if bold:
+        rpr += "<w:b/>"
+    rpr += f'<w:sz w:val="{size * 2}"/>'
+    body = text.replace("\t", '</w:t><w:tab/><w:t xml:space="preserve">')
+    return f'<w:p><w:pPr>{ppr}</w:pPr><w:r><w:rPr>{rpr}</w:rPr><w:t xml:space="preserve">{body}</w:t></w:r></w:p>'
+
+
+def _heading_xml(token: str) -> str:
+    return _para_xml(token, align="left", bold=True, before=8, after=4, first_indent=False)
+
+
+def _clause_xml(token: str, after: int = 3) -> str:
+    return _para_xml(token, after=after, first_indent=False)
+
+
+_TWO_COL_TAB = ("left", 4989)  # 8.8 cm
+
+# Page body mirroring build_doc() and the styles in set_doc_defaults(); keep them in sync.
+# {{TOKEN}} placeholders are filled by render_document_xml().
+DOCUMENT_XML = (
+    "<?xml version='1.0' encoding='UTF-8' standalone='yes'?>\n"
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><w:body>'
+    + _para_xml("{{TITLE}}", align="center", bold=True, size=14, after=6, first_indent=False)
+    + _para_xml("{{SUBTITLE}}", align="center", after=10, first_indent=False)
+    + _para_xml("{{CITY}}\t{{SIGN_DATE}}", align="", after=8, first_indent=False, tab=("right", 9354))
+    + _para_xml("{{INTRO}}", after=8)
+    + _heading_xml("{{h1}}")
+    + _clause_xml("{{P11}}", after=4)
+    + _clause_xml("{{p12}}")
+    + "{{bullets}}"
+    + _heading_xml("{{h2}}")
+    + _clause_xml("{{p21}}")
+    + _clause_xml("{{p22}}")
+    + _clause_xml("{{p23}}", after=6)
+    + _heading_xml("{{h3}}")
+    + _clause_xml("{{p31}}")
+    + _clause_xml("{{p32}}", after=6)
+    + _heading_xml("{{h4}}")
+    + _clause_xml("{{p41}}")
+    + _clause_xml("{{p42}}")
+    + _clause_xml("{{p43}}", after=8)
+    + _heading_xml("{{h5}}")
+    + _para_xml("Принципал\tАгент", align="left", bold=True, after=4, first_indent=False, tab=_TWO_COL_TAB)
+    + _para_xml(
+        "{{PRINCIPAL_SHORT}}\tИП Замятин Николай Григорьевич",
+        align="left",
+        after=2,
+        first_indent=False,
+        tab=_TWO_COL_TAB,
+    )
+    + _para_xml("{{PRINCIPAL_POSITION_SIGN}}\t", align="left", after=8, first_indent=False, tab=_TWO_COL_TAB)
+    + _para_xml("____________ М.П.\t____________ М.П.", align="left", after=2, first_indent=False, tab=_TWO_COL_TAB)
+    + _para_xml("{{PRINCIPAL_SIGNER_SHORT}}\tЗамятин Н.Г.", align="left", after=0, first_indent=False, tab=_TWO_COL_TAB)
+    + '<w:sectPr><w:pgSz w:w="12240" w:h="15840"/>'
+    '<w:pgMar w:top="1134" w:right="1134" w:bottom="1134" w:left="1134" w:header="720" w:footer="720" w:gutter="0"/>'
+    '<w:cols w:space="720"/><w:docGrid w:linePitch="360"/></w:sectPr>'
+    "</w:body></w:document>"
+)
 
-    doc = Document()
-    set_doc_defaults(doc)
+BULLET_XML = _clause_xml("• {text}", after=2)
 
-    title = f"Дополнительное соглашение № {args.ds_no}"
-    subtitle = f"к {agreement_label_dative(args.agreement_kind)} № {args.agreement_no} от {args.agreement_date}."
+# Package parts (styles, settings, content types) are taken from python-docx's blank document,
+# the same base Document() starts from in the legacy path.
+BASE_PACKAGE = Path(docx.__file__).parent / "templates" / "default.docx"
 
-    add_para(doc, title, align=WD_ALIGN_PARAGRAPH.CENTER, bold=True, size=14, after=6, first_indent=False)
-    add_para(doc, subtitle, align=WD_ALIGN_PARAGRAPH.CENTER, size=12, after=10, first_indent=False)
+WRITE_BUFFER_SIZE = 1 << 18
+
+# Same Normal style as set_doc_defaults(), so text typed into the document in Word matches.
+_NORMAL_STYLE = re.compile(r'(<w:style w:type="paragraph" w:default="1" w:styleId="Normal">.*?)(\s*</w:style>)', re.S)
+_NORMAL_RPR = '<w:rPr><w:rFonts w:ascii="Times New Roman" w:hAnsi="Times New Roman"/><w:sz w:val="24"/></w:rPr>'
+
+_PLACEHOLDER = re.compile(r"\{\{(\w+)\}\}")
 
-    city_line = doc.add_paragraph()
-    city_line.paragraph_format.space_after = Pt(8)
-    city_line.paragraph_format.line_spacing = 1.15
-    city_line.paragraph_format.tab_stops.add_tab_stop(Cm(16.5), WD_TAB_ALIGNMENT.RIGHT)
-    city_run = city_line.add_run(f"{args.city}\t{format_ru_date(args.sign_date)}")
-    city_run.font.name = "Times New Roman"
-    city_run.font.size = Pt(12)
 
-    intro = (
+def intro_text(args: argparse.Namespace) -> str:
+    return (
         "Индивидуальный предприниматель Замятин Николай Григорьевич "
         "(ОГРНИП 313590433900045), именуемый в дальнейшем «Агент», с одной стороны, "
         f"и {args.principal_full}, в лице {args.principal_position_intro} {args.principal_signer_full}, "
@@ -186,38 +404,133 @@ def build_doc(args: argparse.Namespace) -> Document:
         "с другой стороны, совместно именуемые «Стороны», заключили настоящее "
         f"Дополнительное соглашение №{args.ds_no} (далее - Соглашение) о нижеследующем:"
     )
-    add_para(doc, intro, after=8)
 
-    p11 = (
+
+def clause_11_text(args: argparse.Namespace) -> str:
+    return (
         "1.1. Настоящее Дополнительное соглашение регулирует порядок расчётов и оказания услуг по "
         "сопровождению обязательной маркировки рекламы (далее — «Услуги маркировки») в рамках "
         f"{agreement_label_genitive(args.agreement_kind)} №\u202f{args.agreement_no} "
         f"от {format_ru_date(args.agreement_date)[: -5]} г. (далее — «Договор»)."
     )
 
-    add_para(doc, template["h1"], align=WD_ALIGN_PARAGRAPH.LEFT, bold=True, before=8, after=4, first_indent=False)
-    add_para(doc, p11, after=4, first_indent=False)
-    add_para(doc, template["p12"], after=3, first_indent=False)
 
-    items = [x.strip(" -—\t") for x in re.split(r"[\n\r]+", template["bullets"]) if x.strip()]
-    for item in items:
+def bullet_items(template: dict[str, str]) -> list[str]:
+    return [x.strip(" -—\t") for x in _BULLET_SPLIT.split(template["bullets"]) if x.strip()]
+
+
+def _bullets_xml(template: dict[str, str]) -> str:
+    return "".join(BULLET_XML.format(text=_xml_text(item)) for item in bullet_items(template))
+
+
+# Placeholder replacements for the fallback texts, escaped once at import.
+_FALLBACK_BLOCKS_ESCAPED = {key: _xml_text(value) for key, value in _FALLBACKS.items()}
+_FALLBACK_BLOCKS_ESCAPED["bullets"] = _bullets_xml(_FALLBACKS)
+
+
+def build_context(args: argparse.Namespace, template_xml: dict[str, str]) -> dict[str, str]:
+    """Map every DOCUMENT_XML placeholder to its XML-escaped replacement.
+
+    ``template_xml`` is the pre-escaped block dict from extract_template_xml().
+    """
+    context = dict(template_xml)
+    context.update(
+        TITLE=_xml_text(f"Дополнительное соглашение № {args.ds_no}"),
+        SUBTITLE=_xml_text(
+            f"к {agreement_label_dative(args.agreement_kind)} № {args.agreement_no} от {args.agreement_date}."
+        ),
+        CITY=_xml_text(args.city),
+        SIGN_DATE=_xml_text(format_ru_date(args.sign_date)),
+        INTRO=_xml_text(intro_text(args)),
+        P11=_xml_text(clause_11_text(args)),
+        PRINCIPAL_SHORT=_xml_text(args.principal_short),
+        PRINCIPAL_POSITION_SIGN=_xml_text(args.principal_position_sign),
+        PRINCIPAL_SIGNER_SHORT=_xml_text(args.principal_signer_short),
+    )
+    return context
+
+
+def render_document_xml(context: dict[str, str]) -> bytes:
+    return _PLACEHOLDER.sub(lambda m: context[m.group(1)], DOCUMENT_XML).encode("utf-8")
+
+
+@functools.lru_cache(maxsize=1)
+def _base_package() -> tuple[bytes, tuple[int, ...]]:
+    """Deflate the static parts of ``BASE_PACKAGE`` once; only document.xml changes per DS."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(BASE_PACKAGE) as zin, zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zout:
+        for info in zin.infolist():
+            if info.filename == "word/document.xml":
+                date_time = info.date_time
+            elif info.filename == "word/styles.xml":
+                styles = zin.read(info).decode("utf-8")
+                styles, found = _NORMAL_STYLE.subn(lambda m: m.group(1) + _NORMAL_RPR + m.group(2), styles, count=1)
+                if not found:
+                    raise RuntimeError(f"Normal style not found in {BASE_PACKAGE}")
+                zout.writestr(info, styles.encode("utf-8"))
+            else:
+                zout.writestr(info, zin.read(info))
+    return buf.getvalue(), date_time
+
+
+def package_docx(document_xml: bytes) -> bytes:
+    """Return ``BASE_PACKAGE`` with ``word/document.xml`` replaced, as DOCX bytes.
+
+    The document part is appended uncompressed (``ZIP_STORED``) so no deflate pass runs per DS.
+    """
+    base, date_time = _base_package()
+    buf = io.BytesIO(base)
+    with zipfile.ZipFile(buf, "a") as zout:
+        zout.writestr(zipfile.ZipInfo("word/document.xml", date_time), document_xml)
+    return buf.getvalue()
+
+
+def write_file(data: bytes, out: Path) -> None:
+    # The whole DOCX is assembled in memory, so it goes to disk in one buffered write.
+    with open(out, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+        f.write(data)
+
+
+def build_doc(args: argparse.Namespace, template: dict[str, str]) -> Document:
+    doc = Document()
+    set_doc_defaults(doc)
+
+    title = f"Дополнительное соглашение № {args.ds_no}"
+    subtitle = f"к {agreement_label_dative(args.agreement_kind)} № {args.agreement_no} от {args.agreement_date}."
+
+    add_para(doc, title, align=WD_ALIGN_PARAGRAPH.CENTER, bold=True, size=14, after=6, first_indent=False)
+    add_para(doc, subtitle, align=WD_ALIGN_PARAGRAPH.CENTER, after=10, first_indent=False)
+
+    city_line = doc.add_paragraph()
+    city_line.paragraph_format.space_after = _PT[8]
+    city_line.paragraph_format.line_spacing = 1.15
+    city_line.paragraph_format.tab_stops.add_tab_stop(_CM[16.5], WD_TAB_ALIGNMENT.RIGHT)
+    city_line.add_run(f"{args.city}\t{format_ru_date(args.sign_date)}")
+
+    add_para(doc, intro_text(args), after=8)
+
+    add_para(doc, template["h1"], style="HeadingBold")
+    add_para(doc, clause_11_text(args), after=4, first_indent=False)
+    add_para(doc, template["p12"], first_indent=False)
+
+    for item in bullet_items(template):
         add_para(doc, f"• {item}", after=2, first_indent=False)
 
-    add_para(doc, template["h2"], align=WD_ALIGN_PARAGRAPH.LEFT, bold=True, before=8, after=4, first_indent=False)
-    add_para(doc, template["p21"], after=3, first_indent=False)
-    add_para(doc, template["p22"], after=3, first_indent=False)
+    add_para(doc, template["h2"], style="HeadingBold")
+    add_para(doc, template["p21"], first_indent=False)
+    add_para(doc, template["p22"], first_indent=False)
     add_para(doc, template["p23"], after=6, first_indent=False)
 
-    add_para(doc, template["h3"], align=WD_ALIGN_PARAGRAPH.LEFT, bold=True, before=8, after=4, first_indent=False)
-    add_para(doc, template["p31"], after=3, first_indent=False)
+    add_para(doc, template["h3"], style="HeadingBold")
+    add_para(doc, template["p31"], first_indent=False)
     add_para(doc, template["p32"], after=6, first_indent=False)
 
-    add_para(doc, template["h4"], align=WD_ALIGN_PARAGRAPH.LEFT, bold=True, before=8, after=4, first_indent=False)
-    add_para(doc, template["p41"], after=3, first_indent=False)
-    add_para(doc, template["p42"], after=3, first_indent=False)
+    add_para(doc, template["h4"], style="HeadingBold")
+    add_para(doc, template["p41"], first_indent=False)
+    add_para(doc, template["p42"], first_indent=False)
     add_para(doc, template["p43"], after=8, first_indent=False)
 
-    add_para(doc, template["h5"], align=WD_ALIGN_PARAGRAPH.LEFT, bold=True, before=8, after=4, first_indent=False)
+    add_para(doc, template["h5"], style="HeadingBold")
     add_two_col(doc, "Принципал", "Агент", bold=True, after=4)
     add_two_col(doc, args.principal_short, "ИП Замятин Николай Григорьевич", after=2)
     add_two_col(doc, args.principal_position_sign, "", after=8)
@@ -227,49 +540,166 @@ def build_doc(args: argparse.Namespace) -> Document:
     return doc
 
 
+# Per-document fields: required on the command line, or in every row of a --batch file.
+REQUIRED_FIELDS = (
+    "output",
+    "ds_no",
+    "agreement_no",
+    "agreement_date",
+    "sign_date",
+    "principal_full",
+    "principal_short",
+    "principal_position_intro",
+    "principal_position_sign",
+    "principal_signer_full",
+    "principal_signer_short",
+)
+BATCH_FIELDS = REQUIRED_FIELDS + ("agreement_kind", "city", "acting_word")
+AGREEMENT_KINDS = ("agent", "contract")
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Generate marking DS DOCX from template.")
     parser.add_argument("--template", required=True, help="Path to template .docx")
-    parser.add_argument("--output", required=True, help="Output .docx path")
+    parser.add_argument("--output", help="Output .docx path")
+    parser.add_argument(
+        "--batch",
+        help="JSON list or CSV file with one DS per row; keys are option names (e.g. ds-no or ds_no), "
+        "and command-line values act as defaults for every row",
+    )
 
-    parser.add_argument("--ds-no", required=True, help="ДС номер (e.g. 1, 2)")
-    parser.add_argument("--agreement-kind", choices=["agent", "contract"], default="agent")
-    parser.add_argument("--agreement-no", required=True, help="Contract number, e.g. AG-092023-1880")
-    parser.add_argument("--agreement-date", required=True, help="DD.MM.YYYY")
-    parser.add_argument("--sign-date", required=True, help="DD.MM.YYYY")
+    parser.add_argument("--ds-no", help="ДС номер (e.g. 1, 2)")
+    parser.add_argument("--agreement-kind", choices=AGREEMENT_KINDS, default="agent")
+    parser.add_argument("--agreement-no", help="Contract number, e.g. AG-092023-1880")
+    parser.add_argument("--agreement-date", help="DD.MM.YYYY")
+    parser.add_argument("--sign-date", help="DD.MM.YYYY")
     parser.add_argument("--city", default="г. Пермь")
 
-    parser.add_argument("--principal-full", required=True, help="Full legal name in intro")
-    parser.add_argument("--principal-short", required=True, help="Short name for signature block")
+    parser.add_argument("--principal-full", help="Full legal name in intro")
+    parser.add_argument("--principal-short", help="Short name for signature block")
     parser.add_argument(
         "--principal-position-intro",
-        required=True,
         help="Position in genitive case for intro, e.g. 'Генерального директора'",
     )
     parser.add_argument(
         "--principal-position-sign",
-        required=True,
         help="Position for signature block, e.g. 'Генеральный директор'",
     )
-    parser.add_argument("--principal-signer-full", required=True, help="FIO in genitive case")
-    parser.add_argument("--principal-signer-short", required=True, help="FIO short, e.g. Иванов И.И.")
+    parser.add_argument("--principal-signer-full", help="FIO in genitive case")
+    parser.add_argument("--principal-signer-short", help="FIO short, e.g. Иванов И.И.")
     parser.add_argument(
         "--acting-word",
         default="действующего",
         help="Word in intro: действующего / действующей",
     )
+    parser.add_argument(
+        "--legacy",
+        action="store_true",
+        help="Build the document through python-docx instead of the XML skeleton",
+    )
 
-    return parser.parse_args()
+    args = parser.parse_args()
+    if not args.batch:
+        missing = [f"--{name.replace('_', '-')}" for name in REQUIRED_FIELDS if getattr(args, name) is None]
+        if missing:
+            parser.error(f"the following arguments are required: {', '.join(missing)}")
+    return args
+
+
+def load_batch(args: argparse.Namespace) -> list[argparse.Namespace]:
+    """Read ``--batch`` rows and merge each over the command-line arguments."""
+    path = Path(args.batch)
+    text = path.read_text(encoding="utf-8-sig")
+    if path.suffix.lower() == ".csv":
+        # Not splitlines(): quoted fields may span lines.
+        rows = list(csv.DictReader(io.StringIO(text, newline="")))
+    else:
+        try:
+            rows = json.loads(text)
+        except ValueError as e:
+            raise SystemExit(f"{path}: invalid JSON: {e}")
+        if not isinstance(rows, list):
+            raise SystemExit(f"{path}: expected a JSON list of objects, one per DS")
+
+    jobs = []
+    outputs: dict[Path, int] = {}
+    for n, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            raise SystemExit(f"{path}: row {n}: expected an object with DS fields")
+        values = {}
+        for key, value in row.items():
+            if key is None:  # csv.DictReader puts cells beyond the header under None
+                raise SystemExit(f"{path}: row {n}: more cells than header columns")
+            name = key.strip().lstrip("-").replace("-", "_")
+            if name not in BATCH_FIELDS:
+                raise SystemExit(f"{path}: row {n}: unknown field {key!r}")
+            if value is not None and str(value).strip():
+                values[name] = str(value).strip()
+
+        job = argparse.Namespace(**{**vars(args), **values})
+        missing = [name for name in REQUIRED_FIELDS if getattr(job, name) is None]
+        if missing:
+            raise SystemExit(f"{path}: row {n}: missing {', '.join(missing)}")
+        if job.agreement_kind not in AGREEMENT_KINDS:
+            raise SystemExit(f"{path}: row {n}: agreement_kind must be one of {', '.join(AGREEMENT_KINDS)}")
+        # Catch bad values here rather than in a worker, after other rows were written.
+        for name in ("agreement_date", "sign_date"):
+            try:
+                format_ru_date(getattr(job, name))
+            except SystemExit as e:
+                raise SystemExit(f"{path}: row {n}: {name}: {e}")
+        for name in BATCH_FIELDS:
+            bad = _XML_INVALID.search(getattr(job, name))
+            if name != "output" and bad:
+                raise SystemExit(f"{path}: row {n}: {name} contains control character {bad.group()!r}")
+        # Rows are written concurrently, so two rows must never target the same file.
+        out = Path(job.output).resolve()
+        if out in outputs:
+            raise SystemExit(f"{path}: row {n}: output {job.output!r} is already used by row {outputs[out]}")
+        outputs[out] = n
+        jobs.append(job)
+
+    if not jobs:
+        raise SystemExit(f"{path}: no rows")
+    return jobs
+
+
+def generate(args: argparse.Namespace, template: dict[str, str], template_xml: dict[str, str] | None) -> Path:
+    out = Path(args.output)
+    out.parent.mkdir(parents=True, exist_ok=True)
+
+    if args.legacy:
+        buf = io.BytesIO()
+        build_doc(args, template).save(buf)
+        data = buf.getvalue()
+    else:
+        data = package_docx(render_document_xml(build_context(args, template_xml)))
+    write_file(data, out)
+    return out
 
 
 def main() -> None:
     args = parse_args()
-    out = Path(args.output)
-    out.parent.mkdir(parents=True, exist_ok=True)
-
-    doc = build_doc(args)
-    doc.save(str(out))
-    print(out)
+    # Parsed once and shared by every document in a batch.
+    template = extract_template_blocks(Path(args.template))
+    template_xml = None if args.legacy else extract_template_xml(Path(args.template))
+
+    if not args.batch:
+        print(generate(args, template, template_xml))
+        return
+
+    jobs = load_batch(args)
+    errors = []
+    with ThreadPoolExecutor(max_workers=min(8, len(jobs))) as pool:
+        futures = [pool.submit(generate, job, template, template_xml) for job in jobs]
+        # Report every file that was written, even if another row failed.
+        for n, future in enumerate(futures, start=1):
+            try:
+                print(future.result())
+            except (Exception, SystemExit) as e:
+                errors.append(f"{args.batch}: row {n}: {e}")
+    if errors:
+        raise SystemExit("\n".join(errors))
 
 
 if __name__ == "__main__":